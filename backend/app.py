@@ -1,13 +1,20 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import requests
-import uvicorn
-from typing import List, Dict, Any
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict
+import httpx
+from collections import OrderedDict
+from importlib.metadata import version as package_version
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import functools
+import gzip
+import hashlib
 import logging
-import re
 import os
+import time
 from dotenv import load_dotenv
+from tone import NEGATIVE_WORDS, POSITIVE_WORDS, analyze_text_tone, compile_keyword_regex
 
 # Load environment variables
 load_dotenv()
@@ -16,7 +23,22 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Texta Sentiment Analysis API", version="1.0.0")
+# orjson encodes and decodes JSON in C, fall back to the stdlib module without it
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+    dump_json = orjson.dumps
+    load_json = orjson.loads
+except ImportError:
+    import json
+    from fastapi.responses import JSONResponse as DefaultResponse
+
+    def dump_json(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+    load_json = json.loads
+
+app = FastAPI(title="Texta Sentiment Analysis API", version="1.0.0", default_response_class=DefaultResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -40,6 +62,22 @@ app.add_middleware(
 HF_API_TOKEN = os.getenv("HF_API_TOKEN")
 HF_API_BASE = "https://api-inference.huggingface.co/models"
 
+# Retries for failed connections, and backoff for transient HF error responses
+HF_CONNECT_RETRIES = 2
+HF_MAX_RETRIES = 2
+HF_BACKOFF_FACTOR = 0.2
+HF_RETRY_STATUSES = frozenset({429, 502, 503, 504})
+# Longest wait before a retry when HF asks for one (Retry-After, or the
+# estimated_time of a model that is still loading)
+HF_MAX_RETRY_DELAY = float(os.getenv("TEXTA_HF_MAX_RETRY_DELAY", "20"))
+
+# Opt-in: request bodies at least this large (batched texts) are gzipped, at the
+# cheapest compression level since most of the win comes from plain text.
+# Off by default until the Inference API is confirmed to accept gzipped bodies
+HF_GZIP = os.getenv("TEXTA_HF_GZIP", "0") == "1"
+HF_GZIP_MIN_BYTES = 1024
+HF_GZIP_LEVEL = 1
+
 # Available models for HF Inference API
 AVAILABLE_MODELS = {
     "ProsusAI/finbert": "ProsusAI/finbert",
@@ -52,11 +90,17 @@ AVAILABLE_MODELS = {
     "yangheng/deberta-v3-large-absa-v1.1": "yangheng/deberta-v3-large-absa-v1.1"
 }
 
+# Inference endpoint per model, built once instead of on every call
+HF_MODEL_URLS = {name: f"{HF_API_BASE}/{model_id}" for name, model_id in AVAILABLE_MODELS.items()}
+
 class TextInput(BaseModel):
     text: str
     model_name: str = "ProsusAI/finbert"
 
 class SentimentResult(BaseModel):
+    # Built only from trusted values, so handlers skip validation with model_construct
+    model_config = ConfigDict(extra='forbid', frozen=True)
+    
     text: str
     sentiment: str
     confidence: float
@@ -82,81 +126,15 @@ class BatchTextInput(BaseModel):
 class BatchSentimentResult(BaseModel):
     results: List[SentimentResult]
 
-def analyze_text_tone(text: str) -> Dict[str, float]:
-    """Analyze text tone and mood using simplified rule-based analysis"""
-    text_lower = text.lower()
-    
-    # Core emotion keywords - keeping only the most reliable
-    joy_words = ['happy', 'joy', 'excited', 'delighted', 'pleased', 'thrilled', 'ecstatic', 'elated', 'cheerful', 'jubilant', 'wonderful', 'fantastic', 'amazing', 'great', 'good', 'excellent', 'superb', 'marvelous', 'terrific', 'fabulous', 'incredible', 'love', 'like', 'enjoy', 'fun', 'laugh', 'smile', 'bright', 'sunny', 'positive', 'optimistic', 'hopeful', 'inspired']
-    sadness_words = ['sad', 'depressed', 'melancholy', 'sorrowful', 'grief', 'despair', 'hopeless', 'miserable', 'gloomy', 'unhappy', 'disappointed', 'heartbroken', 'devastated', 'crushed', 'defeated', 'lonely', 'isolated', 'abandoned', 'rejected', 'hurt', 'pain', 'suffering', 'tears', 'crying', 'weep', 'mourn', 'grieve', 'terrible', 'awful', 'dreadful', 'horrible']
-    anger_words = ['angry', 'furious', 'enraged', 'irritated', 'annoyed', 'frustrated', 'outraged', 'livid', 'fuming', 'mad', 'rage', 'wrath', 'hostile', 'aggressive', 'violent', 'hate', 'despise', 'loathe', 'abhor', 'detest', 'resent', 'bitter', 'hostile', 'aggressive', 'fierce', 'savage', 'brutal', 'terrible', 'awful', 'horrible', 'dreadful']
-    fear_words = ['afraid', 'scared', 'terrified', 'anxious', 'worried', 'nervous', 'fearful', 'panicked', 'horrified', 'frightened', 'alarmed', 'startled', 'shocked', 'dread', 'terror', 'panic', 'hysteria', 'paranoia', 'suspicious', 'cautious', 'hesitant', 'timid', 'shy', 'cowardly', 'weak', 'vulnerable']
-    
-    # Core tone keywords - keeping only the most reliable
-    formal_words = ['therefore', 'consequently', 'furthermore', 'moreover', 'thus', 'hence', 'accordingly', 'subsequently', 'nevertheless', 'nonetheless', 'however', 'whereas', 'although', 'despite', 'notwithstanding', 'in addition', 'further', 'additionally', 'moreover', 'furthermore', 'consequently', 'as a result', 'for this reason', 'in conclusion', 'to summarize']
-    casual_words = ['hey', 'cool', 'awesome', 'great', 'nice', 'okay', 'yeah', 'yep', 'nope', 'wow', 'omg', 'lol', 'haha', 'fun', 'amazing', 'incredible', 'fantastic', 'super', 'rad', 'sweet', 'neat', 'wonderful', 'lovely', 'beautiful', 'gorgeous', 'stunning', 'breathtaking', 'mind-blowing', 'epic', 'legendary']
-    emotional_words = ['love', 'hate', 'feel', 'emotion', 'passion', 'heart', 'soul', 'crying', 'laughing', 'happy', 'sad', 'angry', 'scared', 'excited', 'worried', 'nervous', 'confident', 'proud', 'ashamed', 'guilty', 'jealous', 'envious', 'grateful', 'thankful', 'blessed', 'fortunate', 'lucky', 'unlucky', 'miserable', 'ecstatic', 'thrilled', 'devastated', 'heartbroken']
-    objective_words = ['data', 'evidence', 'research', 'study', 'analysis', 'statistics', 'facts', 'objective', 'empirical', 'scientific', 'measured', 'quantified', 'verified', 'confirmed', 'validated', 'proven', 'demonstrated', 'established', 'documented', 'recorded', 'observed', 'witnessed', 'reported', 'stated', 'declared', 'announced', 'published', 'released']
-    
-    # Simplified scoring algorithm
-    def calculate_score(text, word_list):
-        words = text.split()
-        if len(words) == 0:
-            return 0.0
-        
-        # Count exact word matches (case-insensitive)
-        exact_matches = sum(1 for word in words if word.lower() in word_list)
-        
-        # Count phrase matches (for multi-word phrases)
-        phrase_matches = sum(1 for phrase in word_list if phrase.lower() in text.lower())
-        
-        total_matches = exact_matches + phrase_matches
-        
-        # Simple scoring: more matches = higher score
-        if total_matches == 0:
-            return 0.0
-        elif total_matches == 1:
-            return 0.3
-        elif total_matches == 2:
-            return 0.6
-        elif total_matches == 3:
-            return 0.8
-        else:
-            return 1.0
-    
-    # Calculate scores
-    joy_score = calculate_score(text_lower, joy_words)
-    sadness_score = calculate_score(text_lower, sadness_words)
-    anger_score = calculate_score(text_lower, anger_words)
-    fear_score = calculate_score(text_lower, fear_words)
-    
-    # Tone scores
-    formal_score = calculate_score(text_lower, formal_words)
-    casual_score = calculate_score(text_lower, casual_words)
-    emotional_score = calculate_score(text_lower, emotional_words)
-    objective_score = calculate_score(text_lower, objective_words)
-    
-    return {
-        'joy_score': joy_score,
-        'sadness_score': sadness_score,
-        'anger_score': anger_score,
-        'fear_score': fear_score,
-        'formal_score': formal_score,
-        'casual_score': casual_score,
-        'emotional_score': emotional_score,
-        'objective_score': objective_score
-    }
-
 @app.get("/test")
 async def test_endpoint():
     """Simple test endpoint"""
     try:
-        import numpy as np
-        import torch
+        # Read versions from package metadata, importing torch would load it into every worker
         return {
-            "numpy_version": np.__version__,
-            "torch_version": torch.__version__,
-            "status": "All imports working"
+            "numpy_version": package_version("numpy"),
+            "torch_version": package_version("torch"),
+            "status": "Packages installed (not imported)"
         }
     except Exception as e:
         return {"error": str(e)}
@@ -171,9 +149,27 @@ async def startup_event():
     else:
         logger.info("Hugging Face API token configured successfully")
     
+    # Shared async client so concurrent requests reuse keep-alive connections
+    app.state.http = httpx.AsyncClient(
+        headers={"Authorization": f"Bearer {HF_API_TOKEN}"} if HF_API_TOKEN else {},
+        timeout=60,
+        transport=httpx.AsyncHTTPTransport(
+            retries=HF_CONNECT_RETRIES,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+    )
+    
+    batcher.start(list(AVAILABLE_MODELS.keys()))
+    
     logger.info(f"Available models: {list(AVAILABLE_MODELS.keys())}")
     logger.info("Using Hugging Face Inference API - no local model loading required")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop request batching and close the Hugging Face Inference API client"""
+    batcher.stop()
+    await app.state.http.aclose()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -188,6 +184,355 @@ async def get_available_models():
         "note": "Using Hugging Face Inference API - no local model loading required"
     }
 
+def build_hf_payload(model_name: str, inputs: Any) -> Dict[str, Any]:
+    """Build the HF Inference API payload for one text or a list of texts"""
+    # Special handling for BART MNLI (zero-shot classification)
+    if model_name == "facebook/bart-large-mnli":
+        return {
+            "inputs": inputs,
+            "parameters": {
+                "candidate_labels": ["positive", "negative", "neutral"]
+            }
+        }
+    return {"inputs": inputs}
+
+# HF statuses for a batched call it rejected (list input unsupported, one text too
+# long or malformed), where sending the texts one by one can succeed
+HF_REJECTED_STATUSES = frozenset({400, 413, 422})
+
+class HFAPIError(HTTPException):
+    """A failed HF Inference API call, keeping the status HF answered with"""
+    
+    def __init__(self, hf_status: int, detail: str):
+        super().__init__(status_code=500, detail=detail)
+        self.hf_status = hf_status
+
+def check_hf_response(response: httpx.Response, model_name: str) -> None:
+    """Raise an HFAPIError for a failed HF Inference API call"""
+    if response.status_code == 401:
+        raise HFAPIError(response.status_code, "HF API error: Unauthorized. Ensure HF_API_TOKEN is set in Render env vars.")
+    if response.status_code == 404:
+        raise HFAPIError(response.status_code, f"HF API error: Not Found. Check model id '{AVAILABLE_MODELS[model_name]}'")
+    if response.status_code != 200:
+        raise HFAPIError(response.status_code, f"HF API error: {response.text}")
+
+def hf_retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying a transient HF error, as long as HF asks for up to the cap"""
+    delay = HF_BACKOFF_FACTOR * 2 ** attempt
+    try:
+        if "retry-after" in response.headers:
+            delay = float(response.headers["retry-after"])
+        elif response.status_code == 503:
+            # {"error": "Model ... is currently loading", "estimated_time": 20.0}
+            delay = float(load_json(response.content).get("estimated_time", delay))
+    except Exception:
+        pass
+    return min(max(delay, 0.0), HF_MAX_RETRY_DELAY)
+
+async def post_hf(model_name: str, inputs: Any, timeout: float = 60) -> Any:
+    """Call the HF Inference API for a model and return the decoded response"""
+    body = dump_json(build_hf_payload(model_name, inputs))
+    headers = {"Content-Type": "application/json"}
+    if HF_GZIP and len(body) >= HF_GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=HF_GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    for attempt in range(HF_MAX_RETRIES + 1):
+        response = await app.state.http.post(
+            HF_MODEL_URLS[model_name],
+            content=body,
+            headers=headers,
+            timeout=timeout
+        )
+        if response.status_code not in HF_RETRY_STATUSES or attempt == HF_MAX_RETRIES:
+            break
+        # HF answers 503 while a model is loading and 429 when rate limited
+        delay = hf_retry_delay(response, attempt)
+        logger.info(f"HF API returned {response.status_code} for {model_name}, retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+    check_hf_response(response, model_name)
+    return load_json(response.content)
+
+async def post_hf_batch(model_name: str, texts: List[str]) -> List[Any]:
+    """Call the HF Inference API for several texts, returning a result or exception per text"""
+    # A single text is sent as a plain string, which every model accepts
+    if len(texts) > 1:
+        try:
+            # Send the whole batch to Hugging Face Inference API in one request
+            result = await post_hf(model_name, texts, timeout=120)
+            if isinstance(result, list) and len(result) == len(texts):
+                return result
+        except HFAPIError as e:
+            # Overload, model loading or bad credentials would only fail once per text
+            if e.hf_status not in HF_REJECTED_STATUSES:
+                raise
+            logger.info(f"Batched HF call for {model_name} rejected, sending texts one by one: {e.detail}")
+    # The model doesn't take batched inputs or one text broke the batch, send the texts concurrently instead
+    return await asyncio.gather(*[post_hf(model_name, text) for text in texts], return_exceptions=True)
+
+# HF pads each batch to its longest text, so /analyze-batch sends texts of
+# similar length together in batches of this size
+HF_BUCKET_SIZE = 16
+
+async def post_hf_bucketed(model_name: str, texts: List[str]) -> List[Any]:
+    """Send texts to HF in concurrent length-sorted batches, returning results in input order"""
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    buckets = [order[i:i + HF_BUCKET_SIZE] for i in range(0, len(order), HF_BUCKET_SIZE)]
+    fetched = await asyncio.gather(*[post_hf_batch(model_name, [texts[i] for i in bucket]) for bucket in buckets])
+    results: List[Any] = [None] * len(texts)
+    for bucket, bucket_results in zip(buckets, fetched):
+        for i, result in zip(bucket, bucket_results):
+            results[i] = result
+    return results
+
+# Concurrent /analyze requests for the same model are sent to HF together,
+# waiting at most MAX_BATCH_LATENCY seconds for others to join the batch
+MAX_BATCH_SIZE = 32
+MAX_BATCH_LATENCY = 0.020
+
+class Batcher:
+    """Collect /analyze texts per model and send them to HF in one request"""
+    
+    def __init__(self, max_batch_size: int, max_latency: float):
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.tasks: List[asyncio.Task] = []
+    
+    def start(self, model_names: List[str]) -> None:
+        for model_name in model_names:
+            queue: asyncio.Queue = asyncio.Queue()
+            self.queues[model_name] = queue
+            self.tasks.append(asyncio.create_task(self.run(model_name, queue)))
+    
+    def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+    
+    async def submit(self, model_name: str, text: str) -> Any:
+        """Queue a text and wait for its HF result"""
+        future = asyncio.get_running_loop().create_future()
+        self.queues[model_name].put_nowait((text, future))
+        return await future
+    
+    async def run(self, model_name: str, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await queue.get()]
+            deadline = loop.time() + self.max_latency
+            while len(items) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Don't wait for HF before collecting the next batch
+            self.tasks.append(asyncio.create_task(self.dispatch(model_name, items)))
+            self.tasks = [task for task in self.tasks if not task.done()]
+    
+    async def dispatch(self, model_name: str, items: List[Tuple[str, asyncio.Future]]) -> None:
+        # post_hf_batch already retries texts one by one when one of them made HF
+        # reject the batch, anything raised here (overload, timeouts, bad
+        # credentials) would fail every text again, so it goes to every request
+        try:
+            results = await post_hf_batch(model_name, [text for text, _ in items])
+        except Exception as e:
+            results = [e] * len(items)
+        for (_, future), result in zip(items, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+batcher = Batcher(MAX_BATCH_SIZE, MAX_BATCH_LATENCY)
+
+# HF results are deterministic per (model, text), so repeated texts are
+# answered from memory instead of another HF round trip
+HF_CACHE_SIZE = int(os.getenv("TEXTA_HF_CACHE_SIZE", "10000"))
+HF_CACHE_TTL = float(os.getenv("TEXTA_HF_CACHE_TTL", "3600"))
+
+class TTLCache:
+    """Least-recently-used cache whose entries expire after a fixed time"""
+    
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: "OrderedDict[Tuple[str, bytes], Tuple[float, Any]]" = OrderedDict()
+    
+    def get(self, key: Tuple[str, bytes]) -> Any:
+        """Return the cached value, or None when missing or expired"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+    
+    def set(self, key: Tuple[str, bytes], value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+hf_cache = TTLCache(HF_CACHE_SIZE, HF_CACHE_TTL)
+
+def cache_key(model_name: str, text: str) -> Tuple[str, bytes]:
+    """Key a text by model and a short digest so long texts aren't kept as keys"""
+    return model_name, hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+def extract_label_score(hf_result: Any) -> Dict[str, Any]:
+    """Normalize HF API outputs (dict, list or list-of-list) to the top label and score"""
+    try:
+        item = hf_result if isinstance(hf_result, dict) else hf_result[0]
+        if isinstance(item, list):
+            item = item[0]
+        return {"label": item.get("label"), "score": item.get("score")}
+    except Exception:
+        return {"label": None, "score": None}
+
+def sentiment_scores(sentiment: str, confidence: float) -> Tuple[str, float, float, float, float]:
+    """Put the confidence on the score matching the sentiment"""
+    if sentiment == 'POSITIVE':
+        return sentiment, confidence, confidence, 0.0, 0.0
+    if sentiment == 'NEGATIVE':
+        return sentiment, confidence, 0.0, confidence, 0.0
+    return 'NEUTRAL', confidence, 0.0, 0.0, confidence
+
+def handle_unknown_result(hf_result: Any) -> Tuple[str, float, float, float, float]:
+    """Default fallback"""
+    return "NEUTRAL", 0.5, 0.33, 0.33, 0.34
+
+# Canonical sentiment for each raw (uppercased) HF label, anything else is neutral
+SENTIMENT_LABELS = {'POSITIVE': 'POSITIVE', 'NEGATIVE': 'NEGATIVE'}
+# BERTweet returns [{"label": "POS", "score": 0.99}, ...]
+BERTWEET_LABELS = {'POS': 'POSITIVE', 'NEG': 'NEGATIVE'}
+# Multilingual sentiment returns [{"label": "Very Positive", "score": 0.49}, ...]
+GRADED_LABELS = {
+    'VERY POSITIVE': 'POSITIVE',
+    'POSITIVE': 'POSITIVE',
+    'NEGATIVE': 'NEGATIVE',
+    'VERY NEGATIVE': 'NEGATIVE',
+}
+
+def handle_label_result(hf_result: Any, label_map: Dict[str, str] = SENTIMENT_LABELS) -> Tuple[str, float, float, float, float]:
+    """Models returning [{"label": ..., "score": 0.87}, ...], mapped through label_map"""
+    ls = extract_label_score(hf_result)
+    label = (ls["label"] or "neutral").upper()
+    confidence = float(ls["score"] or 0.5)
+    return sentiment_scores(label_map.get(label, 'NEUTRAL'), confidence)
+
+def handle_zero_shot_result(hf_result: Any) -> Tuple[str, float, float, float, float]:
+    """BART MNLI zero-shot classification"""
+    # Returns {"sequence": "text", "labels": ["neutral", "negative", "positive"], "scores": [0.38, 0.34, 0.28]}
+    try:
+        labels = hf_result.get("labels", [])
+        scores = hf_result.get("scores", [])
+        if len(labels) > 0 and len(scores) > 0:
+            # Find the highest scoring label
+            max_score_idx = scores.index(max(scores))
+            return sentiment_scores(labels[max_score_idx].upper(), float(scores[max_score_idx]))
+    except Exception:
+        pass
+    return handle_unknown_result(hf_result)
+
+def handle_star_rating_result(hf_result: Any) -> Tuple[str, float, float, float, float]:
+    """5-star rating system"""
+    ls = extract_label_score(hf_result)
+    label_text = (ls["label"] or "3 stars").lower()
+    confidence = float(ls["score"] or 0.5)
+    try:
+        rating = float(label_text.split()[0])
+    except Exception:
+        rating = 3.0
+    if rating >= 4:
+        return sentiment_scores('POSITIVE', confidence)
+    if rating <= 2:
+        return sentiment_scores('NEGATIVE', confidence)
+    return sentiment_scores('NEUTRAL', confidence)
+
+# Turns a model's HF output into (sentiment, confidence, positive, negative, neutral)
+MODEL_HANDLERS: Dict[str, Callable[[Any], Tuple[str, float, float, float, float]]] = {
+    "ProsusAI/finbert": handle_label_result,
+    "facebook/bart-large-mnli": handle_zero_shot_result,
+    "finiteautomata/bertweet-base-sentiment-analysis": functools.partial(handle_label_result, label_map=BERTWEET_LABELS),
+    "nlptown/bert-base-multilingual-uncased-sentiment": handle_star_rating_result,
+    "ahmedrachid/FinancialBERT-Sentiment-Analysis": handle_label_result,
+    "tabularisai/multilingual-sentiment-analysis": functools.partial(handle_label_result, label_map=GRADED_LABELS),
+    "yangheng/deberta-v3-base-absa-v1.1": handle_label_result,
+    "yangheng/deberta-v3-large-absa-v1.1": handle_label_result,
+}
+
+# Texts whose rule-based sentiment is clear-cut (enough keywords of one polarity
+# and none of the other) can be answered locally, skipping HF. Opt-in since the
+# result no longer comes from the requested model
+FAST_PATH = os.getenv("TEXTA_FAST_PATH") == "1"
+FAST_PATH_MIN_MATCHES = 4
+FAST_PATH_CONFIDENCE = 0.95
+
+POSITIVE_KEYWORDS = frozenset(POSITIVE_WORDS)
+SENTIMENT_RE = compile_keyword_regex(POSITIVE_WORDS + NEGATIVE_WORDS)
+
+def fast_path_scores(text: str) -> Optional[Tuple[str, float, float, float, float]]:
+    """Score a clear-cut text locally, or return None when it needs the model"""
+    positive = negative = 0
+    for match in SENTIMENT_RE.findall(text.lower()):
+        if match in POSITIVE_KEYWORDS:
+            positive += 1
+        else:
+            negative += 1
+    if positive >= FAST_PATH_MIN_MATCHES and negative == 0:
+        return sentiment_scores('POSITIVE', FAST_PATH_CONFIDENCE)
+    if negative >= FAST_PATH_MIN_MATCHES and positive == 0:
+        return sentiment_scores('NEGATIVE', FAST_PATH_CONFIDENCE)
+    return None
+
+async def get_sentiment_scores(model_name: str, text: str) -> Tuple[str, float, float, float, float]:
+    """Score a text on the fast path, or from its cached or batched HF result"""
+    if FAST_PATH:
+        scores = fast_path_scores(text)
+        if scores is not None:
+            return scores
+    key = cache_key(model_name, text)
+    result = hf_cache.get(key)
+    if result is None:
+        result = await batcher.submit(model_name, text)
+        hf_cache.set(key, result)
+    # Process results based on model type
+    return MODEL_HANDLERS.get(model_name, handle_unknown_result)(result)
+
+def build_sentiment_result(text: str, model_name: str, scores: Tuple[str, float, float, float, float]) -> SentimentResult:
+    """Combine a text's sentiment scores with its tone scores"""
+    sentiment, confidence, positive_score, negative_score, neutral_score = scores
+    
+    # Analyze tone and mood
+    tone_scores = analyze_text_tone(text)
+
+    return SentimentResult.model_construct(
+        text=text,
+        sentiment=sentiment,
+        confidence=confidence,
+        model_name=model_name,
+        positive_score=positive_score,
+        negative_score=negative_score,
+        neutral_score=neutral_score,
+        joy_score=tone_scores['joy_score'],
+        sadness_score=tone_scores['sadness_score'],
+        anger_score=tone_scores['anger_score'],
+        fear_score=tone_scores['fear_score'],
+        formal_score=tone_scores['formal_score'],
+        casual_score=tone_scores['casual_score'],
+        emotional_score=tone_scores['emotional_score'],
+        objective_score=tone_scores['objective_score']
+    )
+
 @app.post("/analyze", response_model=SentimentResult)
 async def analyze_sentiment(text_input: TextInput):
     """Analyze sentiment of a single text using Hugging Face Inference API"""
@@ -200,347 +545,62 @@ async def analyze_sentiment(text_input: TextInput):
         if model_name not in AVAILABLE_MODELS:
             raise HTTPException(status_code=400, detail=f"Model {text_input.model_name} not available")
         
-        # Call Hugging Face Inference API
-        headers = {"Authorization": f"Bearer {HF_API_TOKEN}"} if HF_API_TOKEN else {}
-        
-        # Special handling for BART MNLI (zero-shot classification)
-        if model_name == "facebook/bart-large-mnli":
-            payload = {
-                "inputs": text_input.text,
-                "parameters": {
-                    "candidate_labels": ["positive", "negative", "neutral"]
-                }
-            }
-        else:
-            payload = {"inputs": text_input.text}
-        
-        response = requests.post(
-            f"{HF_API_BASE}/{AVAILABLE_MODELS[model_name]}",
-            headers=headers,
-            json=payload,
-            timeout=60
-        )
-        
-        if response.status_code == 401:
-            raise HTTPException(status_code=500, detail="HF API error: Unauthorized. Ensure HF_API_TOKEN is set in Render env vars.")
-        if response.status_code == 404:
-            raise HTTPException(status_code=500, detail=f"HF API error: Not Found. Check model id '{AVAILABLE_MODELS[model_name]}'")
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail=f"HF API error: {response.text}")
-        
-        result = response.json()
-        
-        # Helper to normalize HF API outputs (list or list-of-list)
-        def extract_label_score(hf_result: Any) -> Dict[str, Any]:
-            try:
-                item = hf_result[0]
-                if isinstance(item, list):
-                    item = item[0]
-                return {"label": item.get("label"), "score": item.get("score")}
-            except Exception:
-                return {"label": None, "score": None}
-
-                # Process results based on model type
-        if model_name == "ProsusAI/finbert":
-            # FinBERT returns [{"label": "neutral", "score": 0.87}, ...]
-            ls = extract_label_score(result)
-            label = (ls["label"] or "neutral").upper()
-            confidence = float(ls["score"] or 0.5)
-            if label == 'POSITIVE':
-                sentiment = 'POSITIVE'
-                positive_score = confidence
-                negative_score = 0.0
-                neutral_score = 0.0
-            elif label == 'NEGATIVE':
-                sentiment = 'NEGATIVE'
-                positive_score = 0.0
-                negative_score = confidence
-                neutral_score = 0.0
-            else:
-                sentiment = 'NEUTRAL'
-                positive_score = 0.0
-                negative_score = 0.0
-                neutral_score = confidence
-
-        elif model_name == "facebook/bart-large-mnli":
-            # BART MNLI zero-shot classification
-            # Returns {"sequence": "text", "labels": ["neutral", "negative", "positive"], "scores": [0.38, 0.34, 0.28]}
-            try:
-                labels = result.get("labels", [])
-                scores = result.get("scores", [])
-                if len(labels) > 0 and len(scores) > 0:
-                    # Find the highest scoring label
-                    max_score_idx = scores.index(max(scores))
-                    top_label = labels[max_score_idx].upper()
-                    confidence = float(scores[max_score_idx])
-                    
-                    if top_label == 'POSITIVE':
-                        sentiment = 'POSITIVE'
-                        positive_score = confidence
-                        negative_score = 0.0
-                        neutral_score = 0.0
-                    elif top_label == 'NEGATIVE':
-                        sentiment = 'NEGATIVE'
-                        positive_score = 0.0
-                        negative_score = confidence
-                        neutral_score = 0.0
-                    else:
-                        sentiment = 'NEUTRAL'
-                        positive_score = 0.0
-                        negative_score = 0.0
-                        neutral_score = confidence
-                else:
-                    sentiment = "NEUTRAL"
-                    confidence = 0.5
-                    positive_score = 0.33
-                    negative_score = 0.33
-                    neutral_score = 0.34
-            except Exception:
-                sentiment = "NEUTRAL"
-                confidence = 0.5
-                positive_score = 0.33
-                negative_score = 0.33
-                neutral_score = 0.34
-
-        elif model_name == "finiteautomata/bertweet-base-sentiment-analysis":
-            # BERTweet returns [{"label": "POS", "score": 0.99}, ...]
-            ls = extract_label_score(result)
-            raw = (ls["label"] or "NEU").upper()
-            confidence = float(ls["score"] or 0.5)
-            if raw == 'POS':
-                sentiment = "POSITIVE"
-                positive_score = confidence
-                negative_score = 0.0
-                neutral_score = 0.0
-            elif raw == 'NEG':
-                sentiment = "NEGATIVE"
-                positive_score = 0.0
-                negative_score = confidence
-                neutral_score = 0.0
-            else:
-                sentiment = "NEUTRAL"
-                positive_score = 0.0
-                negative_score = 0.0
-                neutral_score = confidence
-
-        elif model_name == "nlptown/bert-base-multilingual-uncased-sentiment":
-            # 5-star rating system
-            ls = extract_label_score(result)
-            label_text = (ls["label"] or "3 stars").lower()
-            confidence = float(ls["score"] or 0.5)
-            try:
-                rating = float(label_text.split()[0])
-            except Exception:
-                rating = 3.0
-            if rating >= 4:
-                sentiment = "POSITIVE"
-                positive_score = confidence
-                negative_score = 0.0
-                neutral_score = 0.0
-            elif rating <= 2:
-                sentiment = "NEGATIVE"
-                positive_score = 0.0
-                negative_score = confidence
-                neutral_score = 0.0
-            else:
-                sentiment = "NEUTRAL"
-                positive_score = 0.0
-                negative_score = 0.0
-                neutral_score = confidence
-
-        elif model_name == "ahmedrachid/FinancialBERT-Sentiment-Analysis":
-            # FinancialBERT returns [{"label": "neutral", "score": 0.99}, ...]
-            ls = extract_label_score(result)
-            label = (ls["label"] or "neutral").upper()
-            confidence = float(ls["score"] or 0.5)
-            if label == 'POSITIVE':
-                sentiment = 'POSITIVE'
-                positive_score = confidence
-                negative_score = 0.0
-                neutral_score = 0.0
-            elif label == 'NEGATIVE':
-                sentiment = 'NEGATIVE'
-                positive_score = 0.0
-                negative_score = confidence
-                neutral_score = 0.0
-            else:
-                sentiment = 'NEUTRAL'
-                positive_score = 0.0
-                negative_score = 0.0
-                neutral_score = confidence
-
-        elif model_name == "tabularisai/multilingual-sentiment-analysis":
-            # Multilingual sentiment returns [{"label": "Very Positive", "score": 0.49}, ...]
-            ls = extract_label_score(result)
-            label = (ls["label"] or "Neutral").upper()
-            confidence = float(ls["score"] or 0.5)
-            if 'POSITIVE' in label:
-                sentiment = 'POSITIVE'
-                positive_score = confidence
-                negative_score = 0.0
-                neutral_score = 0.0
-            elif 'NEGATIVE' in label:
-                sentiment = 'NEGATIVE'
-                positive_score = 0.0
-                negative_score = confidence
-                neutral_score = 0.0
-            else:
-                sentiment = 'NEUTRAL'
-                positive_score = 0.0
-                negative_score = 0.0
-                neutral_score = confidence
-
-        elif model_name == "yangheng/deberta-v3-base-absa-v1.1":
-            # DeBERTa v3 base returns [{"label": "Positive", "score": 0.98}, ...]
-            ls = extract_label_score(result)
-            label = (ls["label"] or "Neutral").upper()
-            confidence = float(ls["score"] or 0.5)
-            if label == 'POSITIVE':
-                sentiment = 'POSITIVE'
-                positive_score = confidence
-                negative_score = 0.0
-                neutral_score = 0.0
-            elif label == 'NEGATIVE':
-                sentiment = 'NEGATIVE'
-                positive_score = 0.0
-                negative_score = confidence
-                neutral_score = 0.0
-            else:
-                sentiment = 'NEUTRAL'
-                positive_score = 0.0
-                negative_score = 0.0
-                neutral_score = confidence
-
-        elif model_name == "yangheng/deberta-v3-large-absa-v1.1":
-            # DeBERTa v3 large returns [{"label": "Positive", "score": 0.99}, ...]
-            ls = extract_label_score(result)
-            label = (ls["label"] or "Neutral").upper()
-            confidence = float(ls["score"] or 0.5)
-            if label == 'POSITIVE':
-                sentiment = 'POSITIVE'
-                positive_score = confidence
-                negative_score = 0.0
-                neutral_score = 0.0
-            elif label == 'NEGATIVE':
-                sentiment = 'NEGATIVE'
-                positive_score = 0.0
-                negative_score = confidence
-                neutral_score = 0.0
-            else:
-                sentiment = 'NEUTRAL'
-                positive_score = 0.0
-                negative_score = 0.0
-                neutral_score = confidence
-
-        else:
-            # Default fallback
-            sentiment = "NEUTRAL"
-            confidence = 0.5
-            positive_score = 0.33
-            negative_score = 0.33
-            neutral_score = 0.34
-        
-        # Analyze tone and mood
-        tone_scores = analyze_text_tone(text_input.text)
-
-        return SentimentResult(
-            text=text_input.text,
-            sentiment=sentiment,
-            confidence=confidence,
-            model_name=model_name,
-            positive_score=positive_score,
-            negative_score=negative_score,
-            neutral_score=neutral_score,
-            joy_score=tone_scores['joy_score'],
-            sadness_score=tone_scores['sadness_score'],
-            anger_score=tone_scores['anger_score'],
-            fear_score=tone_scores['fear_score'],
-            formal_score=tone_scores['formal_score'],
-            casual_score=tone_scores['casual_score'],
-            emotional_score=tone_scores['emotional_score'],
-            objective_score=tone_scores['objective_score']
-        )
+        # Call Hugging Face Inference API, batched with concurrent requests
+        scores = await get_sentiment_scores(model_name, text_input.text)
+        return build_sentiment_result(text_input.text, model_name, scores)
         
     except Exception as e:
         logger.error(f"Error analyzing sentiment: {e}")
         raise HTTPException(status_code=500, detail=f"Error analyzing sentiment: {str(e)}")
 
+def validate_batch_input(batch_input: BatchTextInput) -> None:
+    """Reject an empty or oversized batch, or one for a model that isn't available"""
+    if not batch_input.texts:
+        raise HTTPException(status_code=400, detail="Texts list cannot be empty")
+    
+    if len(batch_input.texts) > 100:  # Limit batch size
+        raise HTTPException(status_code=400, detail="Batch size cannot exceed 100 texts")
+    
+    # Check if model is available
+    if batch_input.model_name not in AVAILABLE_MODELS:
+        raise HTTPException(status_code=400, detail=f"Model {batch_input.model_name} not available")
+
 @app.post("/analyze-batch", response_model=BatchSentimentResult)
 async def analyze_batch_sentiment(batch_input: BatchTextInput):
     """Analyze sentiment of multiple texts"""
     try:
-        if not batch_input.texts:
-            raise HTTPException(status_code=400, detail="Texts list cannot be empty")
-        
-        if len(batch_input.texts) > 100:  # Limit batch size
-            raise HTTPException(status_code=400, detail="Batch size cannot exceed 100 texts")
-        
-        # Check if model is available
+        validate_batch_input(batch_input)
         model_name = batch_input.model_name
-        if model_name not in AVAILABLE_MODELS:
-            raise HTTPException(status_code=400, detail=f"Model {model_name} not available")
         
         results = []
+        texts = [text for text in batch_input.texts if text.strip()]
+        if not texts:
+            return BatchSentimentResult(results=results)
         
-        for text in batch_input.texts:
-            if not text.strip():
-                continue
-                
-            # Analyze each text using Hugging Face Inference API
-            headers = {"Authorization": f"Bearer {HF_API_TOKEN}"} if HF_API_TOKEN else {}
-            payload = {"inputs": text}
-            
-            response = requests.post(
-                f"{HF_API_BASE}/{AVAILABLE_MODELS[model_name]}",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"HF API error for text '{text[:50]}...': {response.text}")
-                continue
-                
-            result = response.json()
-            
-            # Process results (similar logic as single analysis)
-            sentiment = result[0]['label']
-            confidence = result[0]['score']
-            
-            # Simplified scoring
-            if sentiment == 'POSITIVE':
-                positive_score = confidence
-                negative_score = 0.0
-                neutral_score = 0.0
-            elif sentiment == 'NEGATIVE':
-                positive_score = 0.0
-                negative_score = confidence
-                neutral_score = 0.0
-            else:
-                positive_score = 0.0
-                negative_score = 0.0
-                neutral_score = confidence
+        # Texts scored on the fast path skip HF entirely
+        scores = [fast_path_scores(text) if FAST_PATH else None for text in texts]
+        
+        # Only send texts that aren't cached to HF, keeping the original order
+        keys = [cache_key(model_name, text) for text in texts]
+        result = [hf_cache.get(key) if text_scores is None else None for key, text_scores in zip(keys, scores)]
+        missing = [i for i, text_result in enumerate(result) if text_result is None and scores[i] is None]
+        if missing:
+            fetched = await post_hf_bucketed(model_name, [texts[i] for i in missing])
+            for i, text_result in zip(missing, fetched):
+                result[i] = text_result
+                if not isinstance(text_result, Exception):
+                    hf_cache.set(keys[i], text_result)
+        
+        handler = MODEL_HANDLERS.get(model_name, handle_unknown_result)
+        for text, text_scores, text_result in zip(texts, scores, result):
+            if text_scores is None:
+                if isinstance(text_result, Exception):
+                    logger.error(f"HF API error for text '{text[:50]}...': {text_result}")
+                    continue
+                # Process results (same logic as single analysis)
+                text_scores = handler(text_result)
             
-            # Analyze tone for batch
-            tone_scores = analyze_text_tone(text)
-
-            results.append(SentimentResult(
-                text=text,
-                sentiment=sentiment,
-                confidence=confidence,
-                model_name=model_name,
-                positive_score=positive_score,
-                negative_score=negative_score,
-                neutral_score=neutral_score,
-                joy_score=tone_scores['joy_score'],
-                sadness_score=tone_scores['sadness_score'],
-                anger_score=tone_scores['anger_score'],
-                fear_score=tone_scores['fear_score'],
-                formal_score=tone_scores['formal_score'],
-                casual_score=tone_scores['casual_score'],
-                emotional_score=tone_scores['emotional_score'],
-                objective_score=tone_scores['objective_score']
-            ))
+            results.append(build_sentiment_result(text, model_name, text_scores))
         
         return BatchSentimentResult(results=results)
         
@@ -548,6 +608,32 @@ async def analyze_batch_sentiment(batch_input: BatchTextInput):
         logger.error(f"Error analyzing batch sentiment: {e}")
         raise HTTPException(status_code=500, detail=f"Error analyzing batch sentiment: {str(e)}")
 
+async def iter_sentiment_results(model_name: str, texts: List[str]):
+    """Yield each text's result, or its error, as an NDJSON line as soon as it is ready"""
+    # Lines arrive in completion order, so each one carries its input index
+    async def analyze_one(index: int, text: str) -> Dict[str, Any]:
+        if not text.strip():
+            return {"index": index, "text": text, "error": "Text cannot be empty"}
+        try:
+            result = build_sentiment_result(text, model_name, await get_sentiment_scores(model_name, text))
+            return {"index": index, **result.model_dump()}
+        except Exception as e:
+            logger.error(f"HF API error for text '{text[:50]}...': {e}")
+            return {"index": index, "text": text, "error": e.detail if isinstance(e, HTTPException) else str(e)}
+    
+    # Texts go through the batcher, so they still reach HF in shared batches
+    for completed in asyncio.as_completed([analyze_one(index, text) for index, text in enumerate(texts)]):
+        yield dump_json(await completed) + b"\n"
+
+@app.post("/analyze-batch-stream")
+async def analyze_batch_sentiment_stream(batch_input: BatchTextInput):
+    """Analyze sentiment of multiple texts, streaming results in completion order"""
+    validate_batch_input(batch_input)
+    return StreamingResponse(
+        iter_sentiment_results(batch_input.model_name, batch_input.texts),
+        media_type="application/x-ndjson"
+    )
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -559,4 +645,5 @@ async def health_check():
     }
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
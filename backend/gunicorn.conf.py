@@ -5,12 +5,19 @@ import os
 bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
 
 # Worker processes
-workers = 1  # Keep at 1 for free tier
+# The app holds no models, only keyword tables built at import, so with
+# preload_app the extra workers share them copy-on-write. The default is sized
+# from the host's cores, not the instance's, so deploys set WEB_CONCURRENCY
+# (render.yaml, Dockerfile, docker-compose.yml)
+workers = int(os.environ.get("WEB_CONCURRENCY", max(1, (os.cpu_count() or 1) * 2 + 1)))
 worker_class = "uvicorn.workers.UvicornWorker"
 worker_connections = 1000
 timeout = 30
 keepalive = 2
 
+# Keep worker heartbeat files in memory instead of on disk
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
 # Restart workers after this many requests, to help control memory usage
 max_requests = 1000
 max_requests_jitter = 100
@@ -1,17 +1,31 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from transformers import pipeline
+from pydantic import BaseModel, ConfigDict, Field
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+import torch
 import uvicorn
-from typing import List, Dict, Any
+from typing import Annotated, List, Dict, Any, Tuple
+import asyncio
+import functools
 import logging
-import re
+import os
+import shutil
+import tempfile
+from tone import analyze_text_tone
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Texta Sentiment Analysis API", version="1.0.0")
+# orjson serializes responses in C, fall back to the stdlib encoder without it
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+except ImportError:
+    from fastapi.responses import JSONResponse as DefaultResponse
+
+app = FastAPI(title="Texta Sentiment Analysis API", version="1.0.0", default_response_class=DefaultResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -31,11 +45,21 @@ app.add_middleware(
 # Initialize sentiment analysis models
 models = {}
 
+# Number of texts per forward pass in /analyze-batch
+PIPELINE_BATCH_SIZE = 16
+
+# Longer inputs are truncated by the tokenizers anyway, so reject them up front
+MAX_TEXT_LENGTH = int(os.getenv("TEXTA_MAX_TEXT_LENGTH", "2048"))
+MAX_BATCH_TEXTS = 100
+
 class TextInput(BaseModel):
-    text: str
+    text: Annotated[str, Field(min_length=1, max_length=MAX_TEXT_LENGTH)]
     model_name: str = "distilbert-base-uncased-finetuned-sst-2-english"
 
 class SentimentResult(BaseModel):
+    # Built only from trusted values, so handlers skip validation with model_construct
+    model_config = ConfigDict(extra='forbid', frozen=True)
+    
     text: str
     sentiment: str
     confidence: float
@@ -55,77 +79,12 @@ class SentimentResult(BaseModel):
     objective_score: float
 
 class BatchTextInput(BaseModel):
-    texts: List[str]
+    texts: Annotated[List[Annotated[str, Field(max_length=MAX_TEXT_LENGTH)]], Field(max_length=MAX_BATCH_TEXTS)]
     model_name: str = "distilbert-base-uncased-finetuned-sst-2-english"
 
 class BatchSentimentResult(BaseModel):
     results: List[SentimentResult]
 
-def analyze_text_tone(text: str) -> Dict[str, float]:
-    """Analyze text tone and mood using simplified rule-based analysis"""
-    text_lower = text.lower()
-    
-    # Core emotion keywords - keeping only the most reliable
-    joy_words = ['happy', 'joy', 'excited', 'delighted', 'pleased', 'thrilled', 'ecstatic', 'elated', 'cheerful', 'jubilant', 'wonderful', 'fantastic', 'amazing', 'great', 'good', 'excellent', 'superb', 'marvelous', 'terrific', 'fabulous', 'incredible', 'love', 'like', 'enjoy', 'fun', 'laugh', 'smile', 'bright', 'sunny', 'positive', 'optimistic', 'hopeful', 'inspired']
-    sadness_words = ['sad', 'depressed', 'melancholy', 'sorrowful', 'grief', 'despair', 'hopeless', 'miserable', 'gloomy', 'unhappy', 'disappointed', 'heartbroken', 'devastated', 'crushed', 'defeated', 'lonely', 'isolated', 'abandoned', 'rejected', 'hurt', 'pain', 'suffering', 'tears', 'crying', 'weep', 'mourn', 'grieve', 'terrible', 'awful', 'dreadful', 'horrible']
-    anger_words = ['angry', 'furious', 'enraged', 'irritated', 'annoyed', 'frustrated', 'outraged', 'livid', 'fuming', 'mad', 'rage', 'wrath', 'hostile', 'aggressive', 'violent', 'hate', 'despise', 'loathe', 'abhor', 'detest', 'resent', 'bitter', 'hostile', 'aggressive', 'fierce', 'savage', 'brutal', 'terrible', 'awful', 'horrible', 'dreadful']
-    fear_words = ['afraid', 'scared', 'terrified', 'anxious', 'worried', 'nervous', 'fearful', 'panicked', 'horrified', 'frightened', 'alarmed', 'startled', 'shocked', 'dread', 'terror', 'panic', 'hysteria', 'paranoia', 'suspicious', 'cautious', 'hesitant', 'timid', 'shy', 'cowardly', 'weak', 'vulnerable']
-    
-    # Core tone keywords - keeping only the most reliable
-    formal_words = ['therefore', 'consequently', 'furthermore', 'moreover', 'thus', 'hence', 'accordingly', 'subsequently', 'nevertheless', 'nonetheless', 'however', 'whereas', 'although', 'despite', 'notwithstanding', 'in addition', 'further', 'additionally', 'moreover', 'furthermore', 'consequently', 'as a result', 'for this reason', 'in conclusion', 'to summarize']
-    casual_words = ['hey', 'cool', 'awesome', 'great', 'nice', 'okay', 'yeah', 'yep', 'nope', 'wow', 'omg', 'lol', 'haha', 'fun', 'amazing', 'incredible', 'fantastic', 'super', 'rad', 'sweet', 'neat', 'wonderful', 'lovely', 'beautiful', 'gorgeous', 'stunning', 'breathtaking', 'mind-blowing', 'epic', 'legendary']
-    emotional_words = ['love', 'hate', 'feel', 'emotion', 'passion', 'heart', 'soul', 'crying', 'laughing', 'happy', 'sad', 'angry', 'scared', 'excited', 'worried', 'nervous', 'confident', 'proud', 'ashamed', 'guilty', 'jealous', 'envious', 'grateful', 'thankful', 'blessed', 'fortunate', 'lucky', 'unlucky', 'miserable', 'ecstatic', 'thrilled', 'devastated', 'heartbroken']
-    objective_words = ['data', 'evidence', 'research', 'study', 'analysis', 'statistics', 'facts', 'objective', 'empirical', 'scientific', 'measured', 'quantified', 'verified', 'confirmed', 'validated', 'proven', 'demonstrated', 'established', 'documented', 'recorded', 'observed', 'witnessed', 'reported', 'stated', 'declared', 'announced', 'published', 'released']
-    
-    # Simplified scoring algorithm
-    def calculate_score(text, word_list):
-        words = text.split()
-        if len(words) == 0:
-            return 0.0
-        
-        # Count exact word matches (case-insensitive)
-        exact_matches = sum(1 for word in words if word.lower() in word_list)
-        
-        # Count phrase matches (for multi-word phrases)
-        phrase_matches = sum(1 for phrase in word_list if phrase.lower() in text.lower())
-        
-        total_matches = exact_matches + phrase_matches
-        
-        # Simple scoring: more matches = higher score
-        if total_matches == 0:
-            return 0.0
-        elif total_matches == 1:
-            return 0.3
-        elif total_matches == 2:
-            return 0.6
-        elif total_matches == 3:
-            return 0.8
-        else:
-            return 1.0
-    
-    # Calculate scores
-    joy_score = calculate_score(text_lower, joy_words)
-    sadness_score = calculate_score(text_lower, sadness_words)
-    anger_score = calculate_score(text_lower, anger_words)
-    fear_score = calculate_score(text_lower, fear_words)
-    
-    # Tone scores
-    formal_score = calculate_score(text_lower, formal_words)
-    casual_score = calculate_score(text_lower, casual_words)
-    emotional_score = calculate_score(text_lower, emotional_words)
-    objective_score = calculate_score(text_lower, objective_words)
-    
-    return {
-        'joy_score': joy_score,
-        'sadness_score': sadness_score,
-        'anger_score': anger_score,
-        'fear_score': fear_score,
-        'formal_score': formal_score,
-        'casual_score': casual_score,
-        'emotional_score': emotional_score,
-        'objective_score': objective_score
-    }
-
 @app.get("/test")
 async def test_endpoint():
     """Simple test endpoint"""
@@ -140,67 +99,354 @@ async def test_endpoint():
     except Exception as e:
         return {"error": str(e)}
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize models on startup"""
-    logger.info("Initializing sentiment analysis models...")
+class SentimentClassifier:
+    """Tokenizer and sequence-classification model called directly, without the pipeline wrapper"""
     
-    # Initialize default model
-    try:
-        models["distilbert-base-uncased-finetuned-sst-2-english"] = pipeline(
-            "sentiment-analysis",
-            model="distilbert-base-uncased-finetuned-sst-2-english"
-        )
-        logger.info("DistilBERT model loaded successfully")
-    except Exception as e:
-        logger.error(f"Failed to load DistilBERT model: {e}")
+    def __init__(self, tokenizer, model, device: str = "cpu"):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.device = device
+        self.id2label = model.config.id2label
     
-    # Initialize additional models
-    try:
-        models["cardiffnlp/twitter-roberta-base-sentiment-latest"] = pipeline(
-            "sentiment-analysis",
-            model="cardiffnlp/twitter-roberta-base-sentiment-latest"
-        )
-        logger.info("RoBERTa Twitter model loaded successfully")
-    except Exception as e:
-        logger.error(f"Failed to load RoBERTa model: {e}")
+    def __call__(self, texts, batch_size: int = 1, truncation: bool = True) -> List[Dict[str, Any]]:
+        """Classify a text or a list of texts into [{'label': ..., 'score': ...}, ...]"""
+        if isinstance(texts, str):
+            texts = [texts]
+        
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size], return_tensors="pt", truncation=truncation, padding=True
+            ).to(self.device)
+            # Models are frozen in eval mode, so skip all autograd bookkeeping
+            with torch.inference_mode():
+                probabilities = self.model(**encoded).logits.float().softmax(-1)
+            scores, label_ids = probabilities.max(-1)
+            outputs.extend(
+                {"label": self.id2label[label_id], "score": score}
+                for label_id, score in zip(label_ids.tolist(), scores.tolist())
+            )
+        return outputs
+
+DEFAULT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+
+# Run models on the GPU in half precision when one is present
+USE_CUDA = torch.cuda.is_available()
+
+# PyTorch models are wrapped in torch.compile with this mode, empty disables it.
+# Autotuning takes minutes on CPU for little gain, so it's only on by default on GPU
+TORCH_COMPILE_MODE = os.getenv("TEXTA_TORCH_COMPILE_MODE", "max-autotune" if USE_CUDA else "")
+
+# Batch sizes and token lengths the compiled model is warmed up on, so the
+# micro-batches and /analyze-batch chunks requests produce are already compiled
+COMPILE_WARMUP_BATCH_SIZES = (1, 2, PIPELINE_BATCH_SIZE)
+COMPILE_WARMUP_LENGTHS = (8, 64, 256)
+
+if USE_CUDA:
+    torch.backends.cuda.matmul.allow_tf32 = True
+else:
+    # Split the cores between the uvicorn workers
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", "1"))))
+
+def compile_classifier(model_name: str, classifier: SentimentClassifier) -> SentimentClassifier:
+    """Compile the default model's classifier and warm it up on representative shapes"""
+    # Only the default model is loaded at startup, the others load inside their
+    # first request, which compiling would stall
+    if TORCH_COMPILE_MODE and model_name == DEFAULT_MODEL:
+        classifier.model = torch.compile(classifier.model, mode=TORCH_COMPILE_MODE, dynamic=True)
+        for batch_size in COMPILE_WARMUP_BATCH_SIZES:
+            for length in COMPILE_WARMUP_LENGTHS:
+                classifier([" ".join(["warmup"] * length)] * batch_size, batch_size=batch_size)
+    return classifier
+
+def load_cuda_classifier(model_name: str) -> SentimentClassifier:
+    """Load a sentiment classifier on the first GPU with bfloat16 weights"""
+    dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+    model = AutoModelForSequenceClassification.from_pretrained(model_name, torch_dtype=dtype).to("cuda")
+    model.eval().requires_grad_(False)
+    return compile_classifier(model_name, SentimentClassifier(AutoTokenizer.from_pretrained(model_name), model, device="cuda"))
+
+def load_torch_classifier(model_name: str) -> SentimentClassifier:
+    """Load a sentiment classifier on the CPU with PyTorch"""
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval().requires_grad_(False)
+    return compile_classifier(model_name, SentimentClassifier(AutoTokenizer.from_pretrained(model_name), model))
+
+# On CPU, serve models through ONNX Runtime with dynamic INT8 quantization when optimum is installed
+USE_ONNX = os.getenv("TEXTA_USE_ONNX", "1") == "1"
+# Exports are hundreds of MB per model, so they live in the user cache, not the source tree
+ONNX_MODEL_DIR = os.getenv("TEXTA_ONNX_MODEL_DIR", os.path.join(os.path.expanduser("~"), ".cache", "texta", "onnx_models"))
+ONNX_FILE_NAME = "model_quantized.onnx"
+
+def onnx_export_complete(save_dir: str) -> bool:
+    """Whether save_dir holds a finished export, not one that was interrupted"""
+    return all(os.path.isfile(os.path.join(save_dir, name)) for name in (ONNX_FILE_NAME, "config.json"))
+
+def export_onnx_model(model_name: str, save_dir: str) -> None:
+    """Export and quantize a model, moving it into save_dir only once it is complete"""
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
     
+    os.makedirs(ONNX_MODEL_DIR, exist_ok=True)
+    export_dir = tempfile.mkdtemp(prefix=".export-", dir=ONNX_MODEL_DIR)
     try:
-        models["nlptown/bert-base-multilingual-uncased-sentiment"] = pipeline(
-            "sentiment-analysis",
-            model="nlptown/bert-base-multilingual-uncased-sentiment"
+        ort_model = ORTModelForSequenceClassification.from_pretrained(
+            model_name, export=True, provider="CPUExecutionProvider"
         )
-        logger.info("BERT Multilingual model loaded successfully")
-    except Exception as e:
-        logger.error(f"Failed to load BERT Multilingual model: {e}")
+        quantizer = ORTQuantizer.from_pretrained(ort_model)
+        quantizer.quantize(
+            save_dir=export_dir,
+            quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        )
+        ort_model.config.save_pretrained(export_dir)
+        
+        # Drop what an interrupted export left behind, then swap the new one in
+        if os.path.isdir(save_dir) and not onnx_export_complete(save_dir):
+            shutil.rmtree(save_dir, ignore_errors=True)
+        try:
+            os.replace(export_dir, save_dir)
+        except OSError:
+            # Another worker finished the same export first
+            if not onnx_export_complete(save_dir):
+                raise
+    finally:
+        shutil.rmtree(export_dir, ignore_errors=True)
+
+def load_onnx_classifier(model_name: str, export: bool) -> SentimentClassifier:
+    """Load a sentiment classifier from a quantized ONNX export, exporting it first if asked"""
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    
+    # Export and quantize once, later startups reuse the saved model
+    save_dir = os.path.join(ONNX_MODEL_DIR, model_name.replace("/", "__"))
+    if not onnx_export_complete(save_dir):
+        if not export:
+            raise FileNotFoundError(f"no ONNX export in {save_dir}")
+        export_onnx_model(model_name, save_dir)
+    
+    quantized_model = ORTModelForSequenceClassification.from_pretrained(
+        save_dir, file_name=ONNX_FILE_NAME, provider="CPUExecutionProvider"
+    )
+    return SentimentClassifier(AutoTokenizer.from_pretrained(model_name), quantized_model)
+
+def load_sentiment_classifier(model_name: str) -> SentimentClassifier:
+    """Load a sentiment classifier, backed by a quantized ONNX model when available"""
+    if USE_CUDA:
+        return load_cuda_classifier(model_name)
+    
+    if not USE_ONNX:
+        return load_torch_classifier(model_name)
     
-    # Add more models
+    # Only the default model loads at startup, exporting any other model would
+    # stall its first request, so those use ONNX only when already exported
     try:
-        models["finiteautomata/bertweet-base-sentiment-analysis"] = pipeline(
-            "sentiment-analysis",
-            model="finiteautomata/bertweet-base-sentiment-analysis"
-        )
-        logger.info("BERTweet sentiment model loaded successfully")
+        return load_onnx_classifier(model_name, export=model_name == DEFAULT_MODEL)
+    except ImportError:
+        logger.info(f"optimum not installed, loading {model_name} with PyTorch")
     except Exception as e:
-        logger.error(f"Failed to load BERTweet model: {e}")
+        logger.warning(f"ONNX model unavailable for {model_name} ({e}), loading it with PyTorch")
+    return load_torch_classifier(model_name)
+
+# Opt-in semantic cache: near-duplicate texts reuse an earlier model output
+USE_SEMANTIC_CACHE = os.getenv("TEXTA_SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("TEXTA_SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("TEXTA_SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+semantic_cache = None
+
+class SemanticCache:
+    """Nearest-neighbour cache of model outputs keyed on sentence embeddings"""
+    
+    def __init__(self, encoder, faiss_module, threshold: float, max_entries: int):
+        self.encoder = encoder
+        self.faiss = faiss_module
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # One index per model, since outputs are only reusable for the same model
+        self.indexes: Dict[str, Any] = {}
+        self.outputs: Dict[str, List[Any]] = {}
+    
+    def embed(self, text: str):
+        # Normalized embeddings make the inner product equal to cosine similarity
+        return self.encoder.encode([text], normalize_embeddings=True).astype("float32")
+    
+    def lookup(self, model_name: str, embedding):
+        index = self.indexes.get(model_name)
+        if index is None or index.ntotal == 0:
+            return None
+        similarities, ids = index.search(embedding, 1)
+        if similarities[0, 0] >= self.threshold:
+            return self.outputs[model_name][ids[0, 0]]
+        return None
     
+    def add(self, model_name: str, embedding, output):
+        if model_name not in self.indexes:
+            dimension = embedding.shape[1]
+            self.indexes[model_name] = self.faiss.IndexHNSWFlat(dimension, 32, self.faiss.METRIC_INNER_PRODUCT)
+            self.outputs[model_name] = []
+        # HNSW indexes can't evict entries, so stop growing once full
+        if len(self.outputs[model_name]) >= self.max_entries:
+            return
+        self.indexes[model_name].add(embedding)
+        self.outputs[model_name].append(output)
+
+def load_semantic_cache():
+    """Create the semantic cache, or return None if its dependencies are missing"""
     try:
-        models["ProsusAI/finbert"] = pipeline(
-            "sentiment-analysis",
-            model="ProsusAI/finbert"
-        )
-        logger.info("FinBERT financial sentiment model loaded successfully")
-    except Exception as e:
-        logger.error(f"Failed to load FinBERT model: {e}")
+        import faiss
+        from sentence_transformers import SentenceTransformer
+    except ImportError as e:
+        logger.warning(f"Semantic cache disabled, missing dependency: {e}")
+        return None
+    encoder = SentenceTransformer("all-MiniLM-L6-v2")
+    return SemanticCache(encoder, faiss, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES)
+
+# Known models and how to load them, each one is loaded on first use
+MODEL_FACTORIES = {
+    "distilbert-base-uncased-finetuned-sst-2-english": functools.partial(load_sentiment_classifier, "distilbert-base-uncased-finetuned-sst-2-english"),
+    "cardiffnlp/twitter-roberta-base-sentiment-latest": functools.partial(load_sentiment_classifier, "cardiffnlp/twitter-roberta-base-sentiment-latest"),
+    "nlptown/bert-base-multilingual-uncased-sentiment": functools.partial(load_sentiment_classifier, "nlptown/bert-base-multilingual-uncased-sentiment"),
+    "finiteautomata/bertweet-base-sentiment-analysis": functools.partial(load_sentiment_classifier, "finiteautomata/bertweet-base-sentiment-analysis"),
+    "ProsusAI/finbert": functools.partial(load_sentiment_classifier, "ProsusAI/finbert"),
+}
+
+DIALOGPT_MODEL = "microsoft/DialoGPT-medium"
+
+# Raw label (upper-cased) -> sentiment for each sentiment-analysis model
+LABEL_MAP = {
+    "distilbert-base-uncased-finetuned-sst-2-english": {"POSITIVE": "POSITIVE", "NEGATIVE": "NEGATIVE"},
+    "cardiffnlp/twitter-roberta-base-sentiment-latest": {"POSITIVE": "POSITIVE", "NEGATIVE": "NEGATIVE", "NEUTRAL": "NEUTRAL"},
+    # 5-star rating system
+    "nlptown/bert-base-multilingual-uncased-sentiment": {
+        "1 STAR": "NEGATIVE", "2 STARS": "NEGATIVE", "3 STARS": "NEUTRAL", "4 STARS": "POSITIVE", "5 STARS": "POSITIVE"
+    },
+    "finiteautomata/bertweet-base-sentiment-analysis": {"POS": "POSITIVE", "NEG": "NEGATIVE", "NEU": "NEUTRAL"},
+    "ProsusAI/finbert": {"POSITIVE": "POSITIVE", "NEGATIVE": "NEGATIVE", "NEUTRAL": "NEUTRAL"},
+}
+
+# Binary classifiers give the rest of the probability to the other class
+BINARY_MODELS = frozenset({"distilbert-base-uncased-finetuned-sst-2-english"})
+
+def to_scores(label_map: Dict[str, str], binary: bool, label: str, confidence: float) -> Tuple[str, float, float, float]:
+    """Map a model label to (sentiment, positive_score, negative_score, neutral_score)"""
+    sentiment = label_map.get(label.upper(), "NEUTRAL")
+    if binary:
+        if sentiment == "POSITIVE":
+            return sentiment, confidence, 1 - confidence, 0.0
+        return sentiment, 1 - confidence, confidence, 0.0
+    if sentiment == "POSITIVE":
+        return sentiment, confidence, 0.0, 0.0
+    if sentiment == "NEGATIVE":
+        return sentiment, 0.0, confidence, 0.0
+    return sentiment, 0.0, 0.0, confidence
+
+# Every model the API accepts, DialoGPT is answered without loading a model
+AVAILABLE_MODELS = list(MODEL_FACTORIES.keys()) + [DIALOGPT_MODEL]
+
+# One lock per model so concurrent first requests trigger a single load
+model_locks = {model_name: asyncio.Lock() for model_name in MODEL_FACTORIES}
+
+async def get_model(model_name: str):
+    """Return the classifier for a model, loading it on first use"""
+    model = models.get(model_name)
+    if model is not None:
+        return model
+    if model_name not in MODEL_FACTORIES:
+        raise HTTPException(status_code=400, detail=f"Model {model_name} not available")
+    
+    async with model_locks[model_name]:
+        if model_name not in models:
+            try:
+                models[model_name] = await run_in_threadpool(MODEL_FACTORIES[model_name])
+                logger.info(f"{model_name} model loaded successfully")
+            except Exception as e:
+                logger.error(f"Failed to load {model_name} model: {e}")
+                raise HTTPException(status_code=400, detail=f"Model {model_name} not available")
+    return models[model_name]
+
+# Concurrent /analyze requests wait up to MAX_BATCH_DELAY seconds to share a forward pass
+MAX_BATCH_SIZE = 16
+MAX_BATCH_DELAY = 0.005
+
+class MicroBatcher:
+    """Collect single-text requests for one model and run them as a batch"""
+    
+    def __init__(self, model, max_batch_size: int, max_delay: float):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task = None
+    
+    async def submit(self, text: str) -> List[Dict[str, Any]]:
+        """Queue a text and wait for its output, shaped like a single model call"""
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((text, future))
+        return await future
+    
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            texts = [text for text, _ in batch]
+            try:
+                outputs = await run_in_threadpool(self.model, texts, batch_size=len(texts), truncation=True)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result([output])
+
+batchers: Dict[str, MicroBatcher] = {}
+
+async def get_batcher(model_name: str) -> MicroBatcher:
+    """Return the micro-batcher for a model, loading the model on first use"""
+    batcher = batchers.get(model_name)
+    if batcher is None:
+        model = await get_model(model_name)
+        batcher = batchers.setdefault(model_name, MicroBatcher(model, MAX_BATCH_SIZE, MAX_BATCH_DELAY))
+    return batcher
+
+@app.on_event("startup")
+async def startup_event():
+    """Initialize models on startup"""
+    global semantic_cache
+    logger.info("Initializing sentiment analysis models...")
+    
+    if USE_SEMANTIC_CACHE:
+        try:
+            semantic_cache = load_semantic_cache()
+            if semantic_cache is not None:
+                logger.info("Semantic cache loaded successfully")
+        except Exception as e:
+            logger.error(f"Failed to load semantic cache: {e}")
     
+    # Warm the default model, the others load on their first request
     try:
-        models["microsoft/DialoGPT-medium"] = pipeline(
-            "text-generation",
-            model="microsoft/DialoGPT-medium"
-        )
-        logger.info("DialoGPT model loaded successfully")
+        await get_model(DEFAULT_MODEL)
     except Exception as e:
-        logger.error(f"Failed to load DialoGPT model: {e}")
+        logger.error(f"Failed to load default model: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the micro-batching tasks"""
+    for batcher in batchers.values():
+        if batcher.task is not None:
+            batcher.task.cancel()
 
 @app.get("/")
 async def root():
@@ -211,8 +457,8 @@ async def root():
 async def get_available_models():
     """Get list of available models"""
     return {
-        "available_models": list(models.keys()),
-        "default_model": "distilbert-base-uncased-finetuned-sst-2-english"
+        "available_models": AVAILABLE_MODELS,
+        "default_model": DEFAULT_MODEL
     }
 
 @app.post("/analyze", response_model=SentimentResult)
@@ -222,126 +468,35 @@ async def analyze_sentiment(text_input: TextInput):
         if not text_input.text.strip():
             raise HTTPException(status_code=400, detail="Text cannot be empty")
         
-        # Get the model
         model_name = text_input.model_name
-        if model_name not in models:
-            raise HTTPException(status_code=400, detail=f"Model {model_name} not available")
-        
-        model = models[model_name]
         
-        # Analyze sentiment
-        result = model(text_input.text)
+        # DialoGPT is a text-generation model without a sentiment head, so it
+        # gets a fixed neutral response and nothing is loaded for it
+        result = None
+        if model_name != DIALOGPT_MODEL:
+            # Get the model's batcher
+            batcher = await get_batcher(model_name)
+            
+            # Analyze sentiment, reusing the output for a near-duplicate text if cached
+            if semantic_cache is not None:
+                embedding = await run_in_threadpool(semantic_cache.embed, text_input.text)
+                result = semantic_cache.lookup(model_name, embedding)
+            if result is None:
+                # Batched with concurrent requests, inference runs in the threadpool
+                result = await batcher.submit(text_input.text)
+                if semantic_cache is not None:
+                    semantic_cache.add(model_name, embedding, result)
         
         # Process results based on model type
-        if model_name == "distilbert-base-uncased-finetuned-sst-2-english":
-            # Binary classification: POSITIVE/NEGATIVE
-            sentiment = result[0]['label']
-            confidence = result[0]['score']
-            
-            if sentiment == 'POSITIVE':
-                positive_score = confidence
-                negative_score = 1 - confidence
-                neutral_score = 0.0
-            else:
-                positive_score = 1 - confidence
-                negative_score = confidence
-                neutral_score = 0.0
-                
-        elif model_name == "cardiffnlp/twitter-roberta-base-sentiment-latest":
-            # Three-class classification: POSITIVE/NEGATIVE/NEUTRAL
-            sentiment = result[0]['label']
-            confidence = result[0]['score']
-            
-            # For simplicity, we'll set the main score and others to 0
-            if sentiment == 'POSITIVE':
-                positive_score = confidence
-                negative_score = 0.0
-                neutral_score = 0.0
-            elif sentiment == 'NEGATIVE':
-                positive_score = 0.0
-                negative_score = confidence
-                neutral_score = 0.0
-            else:
-                positive_score = 0.0
-                negative_score = 0.0
-                neutral_score = confidence
-                
-        elif model_name == "nlptown/bert-base-multilingual-uncased-sentiment":
-            # 5-star rating system
-            rating = float(result[0]['label'].split()[0])
-            confidence = result[0]['score']
-            
-            # Convert 5-star rating to sentiment
-            if rating >= 4:
-                sentiment = "POSITIVE"
-            elif rating <= 2:
-                sentiment = "NEGATIVE"
-            else:
-                sentiment = "NEUTRAL"
-            
-            # Normalize scores for consistency
-            if sentiment == "POSITIVE":
-                positive_score = confidence
-                negative_score = 0.0
-                neutral_score = 0.0
-            elif sentiment == "NEGATIVE":
-                positive_score = 0.0
-                negative_score = confidence
-                neutral_score = 0.0
-            else:
-                positive_score = 0.0
-                negative_score = 0.0
-                neutral_score = confidence
-                
-        elif model_name == "finiteautomata/bertweet-base-sentiment-analysis":
-            # BERTweet sentiment analysis
-            sentiment = result[0]['label'].upper()
-            confidence = result[0]['score']
-            
-            if sentiment == 'POS':
-                positive_score = confidence
-                negative_score = 0.0
-                neutral_score = 0.0
-                sentiment = "POSITIVE"
-            elif sentiment == 'NEG':
-                positive_score = 0.0
-                negative_score = confidence
-                neutral_score = 0.0
-                sentiment = "NEGATIVE"
-            else:
-                positive_score = 0.0
-                negative_score = 0.0
-                neutral_score = confidence
-                sentiment = "NEUTRAL"
-                
-        elif model_name == "ProsusAI/finbert":
-            # FinBERT financial sentiment
-            sentiment = result[0]['label'].upper()
-            confidence = result[0]['score']
-            
-            if sentiment == 'POSITIVE':
-                positive_score = confidence
-                negative_score = 0.0
-                neutral_score = 0.0
-            elif sentiment == 'NEGATIVE':
-                positive_score = 0.0
-                negative_score = confidence
-                neutral_score = 0.0
-            else:
-                positive_score = 0.0
-                negative_score = 0.0
-                neutral_score = confidence
-                
-        elif model_name == "microsoft/DialoGPT-medium":
-            # DialoGPT - use as neutral since it's text generation
-            sentiment = "NEUTRAL"
-            confidence = 0.5
-            positive_score = 0.33
-            negative_score = 0.33
-            neutral_score = 0.34
-            
+        label_map = LABEL_MAP.get(model_name)
+        if label_map is not None:
+            output = result[0]
+            confidence = output['score']
+            sentiment, positive_score, negative_score, neutral_score = to_scores(
+                label_map, model_name in BINARY_MODELS, output['label'], confidence
+            )
         else:
-            # Default fallback
+            # DialoGPT has no sentiment output - use as neutral
             sentiment = "NEUTRAL"
             confidence = 0.5
             positive_score = 0.33
@@ -351,7 +506,7 @@ async def analyze_sentiment(text_input: TextInput):
         # Analyze tone and mood
         tone_scores = analyze_text_tone(text_input.text)
 
-        return SentimentResult(
+        return SentimentResult.model_construct(
             text=text_input.text,
             sentiment=sentiment,
             confidence=confidence,
@@ -380,46 +535,34 @@ async def analyze_batch_sentiment(batch_input: BatchTextInput):
         if not batch_input.texts:
             raise HTTPException(status_code=400, detail="Texts list cannot be empty")
         
-        if len(batch_input.texts) > 100:  # Limit batch size
-            raise HTTPException(status_code=400, detail="Batch size cannot exceed 100 texts")
-        
         # Get the model
         model_name = batch_input.model_name
-        if model_name not in models:
-            raise HTTPException(status_code=400, detail=f"Model {model_name} not available")
-        
-        model = models[model_name]
+        model = await get_model(model_name)
         results = []
+        texts = [text for text in batch_input.texts if text.strip()]
         
-        for text in batch_input.texts:
-            if not text.strip():
-                continue
-                
-            # Analyze each text
-            result = model(text)
-            
-            # Process results (similar logic as single analysis)
-            sentiment = result[0]['label']
-            confidence = result[0]['score']
-            
-            # Simplified scoring
-            if sentiment == 'POSITIVE':
-                positive_score = confidence
-                negative_score = 0.0
-                neutral_score = 0.0
-            elif sentiment == 'NEGATIVE':
-                positive_score = 0.0
-                negative_score = confidence
-                neutral_score = 0.0
-            else:
-                positive_score = 0.0
-                negative_score = 0.0
-                neutral_score = confidence
+        # Run the whole batch through the model at once, shortest texts first
+        # so each padded batch holds similar lengths, then restore the input order
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        outputs = [None] * len(texts)
+        if texts:
+            sorted_outputs = await run_in_threadpool(
+                model, [texts[i] for i in order], batch_size=PIPELINE_BATCH_SIZE, truncation=True
+            )
+            for i, output in zip(order, sorted_outputs):
+                outputs[i] = output
+        
+        label_map = LABEL_MAP[model_name]
+        binary = model_name in BINARY_MODELS
+        for text, result in zip(texts, outputs):
+            # Process results (same logic as single analysis)
+            confidence = result['score']
+            sentiment, positive_score, negative_score, neutral_score = to_scores(label_map, binary, result['label'], confidence)
             
             # Analyze tone for batch
             tone_scores = analyze_text_tone(text)
 
-            results.append(SentimentResult(
+            results.append(SentimentResult.model_construct(
                 text=text,
                 sentiment=sentiment,
                 confidence=confidence,
@@ -449,8 +592,9 @@ async def health_check():
     return {
         "status": "healthy",
         "models_loaded": len(models),
-        "available_models": list(models.keys())
+        "available_models": AVAILABLE_MODELS
     }
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Extra workers scale inference across cores, but each one loads its own models
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=int(os.getenv("WEB_CONCURRENCY", "1")))
@@ -3,8 +3,8 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import uvicorn
 import logging
+from tone import NEGATIVE_WORDS, POSITIVE_WORDS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -34,14 +34,15 @@ class SentimentResult(BaseModel):
     negative_score: float
     neutral_score: float
 
+# Sentiment keywords, built once so each lookup is a constant-time set probe
+POSITIVE_KEYWORDS = frozenset(POSITIVE_WORDS)
+NEGATIVE_KEYWORDS = frozenset(NEGATIVE_WORDS)
+
 def analyze_sentiment_rule_based(text):
     """Simple rule-based sentiment analysis"""
-    positive_words = ['good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic', 'awesome', 'love', 'like', 'happy', 'pleased', 'satisfied', 'perfect', 'brilliant', 'outstanding', 'superb', 'marvelous', 'terrific', 'fabulous', 'incredible']
-    negative_words = ['bad', 'terrible', 'awful', 'horrible', 'hate', 'dislike', 'sad', 'angry', 'frustrated', 'disappointed', 'disgusted', 'annoyed', 'furious', 'upset', 'depressed', 'miserable', 'pathetic', 'useless', 'worthless', 'dreadful']
-    
     words = text.lower().split()
-    positive_score = sum(1 for word in words if word in positive_words)
-    negative_score = sum(1 for word in words if word in negative_words)
+    positive_score = sum(1 for word in words if word in POSITIVE_KEYWORDS)
+    negative_score = sum(1 for word in words if word in NEGATIVE_KEYWORDS)
     
     total_score = positive_score + negative_score
     
@@ -128,4 +129,5 @@ async def analyze_sentiment(text_input: TextInput):
         raise HTTPException(status_code=500, detail=f"Error analyzing sentiment: {str(e)}")
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
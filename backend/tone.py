@@ -0,0 +1,96 @@
+"""Rule-based tone analysis shared by the API servers"""
+from typing import Dict, List, Pattern, Tuple
+import re
+
+# Core emotion keywords - keeping only the most reliable
+JOY_WORDS = ('happy', 'joy', 'excited', 'delighted', 'pleased', 'thrilled', 'ecstatic', 'elated', 'cheerful', 'jubilant', 'wonderful', 'fantastic', 'amazing', 'great', 'good', 'excellent', 'superb', 'marvelous', 'terrific', 'fabulous', 'incredible', 'love', 'like', 'enjoy', 'fun', 'laugh', 'smile', 'bright', 'sunny', 'positive', 'optimistic', 'hopeful', 'inspired')
+SADNESS_WORDS = ('sad', 'depressed', 'melancholy', 'sorrowful', 'grief', 'despair', 'hopeless', 'miserable', 'gloomy', 'unhappy', 'disappointed', 'heartbroken', 'devastated', 'crushed', 'defeated', 'lonely', 'isolated', 'abandoned', 'rejected', 'hurt', 'pain', 'suffering', 'tears', 'crying', 'weep', 'mourn', 'grieve', 'terrible', 'awful', 'dreadful', 'horrible')
+ANGER_WORDS = ('angry', 'furious', 'enraged', 'irritated', 'annoyed', 'frustrated', 'outraged', 'livid', 'fuming', 'mad', 'rage', 'wrath', 'hostile', 'aggressive', 'violent', 'hate', 'despise', 'loathe', 'abhor', 'detest', 'resent', 'bitter', 'fierce', 'savage', 'brutal', 'terrible', 'awful', 'horrible', 'dreadful')
+FEAR_WORDS = ('afraid', 'scared', 'terrified', 'anxious', 'worried', 'nervous', 'fearful', 'panicked', 'horrified', 'frightened', 'alarmed', 'startled', 'shocked', 'dread', 'terror', 'panic', 'hysteria', 'paranoia', 'suspicious', 'cautious', 'hesitant', 'timid', 'shy', 'cowardly', 'weak', 'vulnerable')
+
+# Core tone keywords - keeping only the most reliable
+FORMAL_WORDS = ('therefore', 'consequently', 'furthermore', 'moreover', 'thus', 'hence', 'accordingly', 'subsequently', 'nevertheless', 'nonetheless', 'however', 'whereas', 'although', 'despite', 'notwithstanding', 'in addition', 'further', 'additionally', 'as a result', 'for this reason', 'in conclusion', 'to summarize')
+CASUAL_WORDS = ('hey', 'cool', 'awesome', 'great', 'nice', 'okay', 'yeah', 'yep', 'nope', 'wow', 'omg', 'lol', 'haha', 'fun', 'amazing', 'incredible', 'fantastic', 'super', 'rad', 'sweet', 'neat', 'wonderful', 'lovely', 'beautiful', 'gorgeous', 'stunning', 'breathtaking', 'mind-blowing', 'epic', 'legendary')
+EMOTIONAL_WORDS = ('love', 'hate', 'feel', 'emotion', 'passion', 'heart', 'soul', 'crying', 'laughing', 'happy', 'sad', 'angry', 'scared', 'excited', 'worried', 'nervous', 'confident', 'proud', 'ashamed', 'guilty', 'jealous', 'envious', 'grateful', 'thankful', 'blessed', 'fortunate', 'lucky', 'unlucky', 'miserable', 'ecstatic', 'thrilled', 'devastated', 'heartbroken')
+OBJECTIVE_WORDS = ('data', 'evidence', 'research', 'study', 'analysis', 'statistics', 'facts', 'objective', 'empirical', 'scientific', 'measured', 'quantified', 'verified', 'confirmed', 'validated', 'proven', 'demonstrated', 'established', 'documented', 'recorded', 'observed', 'witnessed', 'reported', 'stated', 'declared', 'announced', 'published', 'released')
+
+# Tone categories, in the order their scores are reported
+TONE_CATEGORIES = {
+    'joy_score': JOY_WORDS,
+    'sadness_score': SADNESS_WORDS,
+    'anger_score': ANGER_WORDS,
+    'fear_score': FEAR_WORDS,
+    'formal_score': FORMAL_WORDS,
+    'casual_score': CASUAL_WORDS,
+    'emotional_score': EMOTIONAL_WORDS,
+    'objective_score': OBJECTIVE_WORDS,
+}
+
+def _build_keyword_index() -> Dict[str, Tuple[int, ...]]:
+    """Map every keyword to the indices of the tone categories it belongs to"""
+    index: Dict[str, List[int]] = {}
+    for category_id, word_list in enumerate(TONE_CATEGORIES.values()):
+        # Lowercased here since texts are lowercased before matching, and a set
+        # so a keyword listed twice in one category still counts once per hit
+        for keyword in {word.lower() for word in word_list}:
+            index.setdefault(keyword, []).append(category_id)
+    return {keyword: tuple(ids) for keyword, ids in index.items()}
+
+def _keyword_pattern(keywords) -> str:
+    """Build a regex alternation of the keywords factored into a prefix trie"""
+    trie: Dict[str, Dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def build(node: Dict[str, Dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        is_word_end = '' in node
+        if len(branches) == 1 and not is_word_end:
+            return branches[0]
+        pattern = '(?:' + '|'.join(branches) + ')'
+        return pattern + '?' if is_word_end else pattern
+    
+    return build(trie)
+
+def compile_keyword_regex(keywords) -> Pattern[str]:
+    """Compile keywords into one regex that matches them only as whole tokens"""
+    return re.compile(r"(?<![\w'-])(?:" + _keyword_pattern(keywords) + r")(?![\w'-])")
+
+# Rule-based sentiment keywords, used when no model is available or a text is clear-cut
+POSITIVE_WORDS = ('good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic', 'awesome', 'love', 'like', 'happy', 'pleased', 'satisfied', 'perfect', 'brilliant', 'outstanding', 'superb', 'marvelous', 'terrific', 'fabulous', 'incredible')
+NEGATIVE_WORDS = ('bad', 'terrible', 'awful', 'horrible', 'hate', 'dislike', 'sad', 'angry', 'frustrated', 'disappointed', 'disgusted', 'annoyed', 'furious', 'upset', 'depressed', 'miserable', 'pathetic', 'useless', 'worthless', 'dreadful')
+
+# Built once at import time so every category is matched in a single pass.
+# The scan runs entirely inside the regex engine and only yields keywords
+# (single words or multi-word phrases) that stand as whole tokens, so the
+# Python loop only touches actual hits, each resolved with one dict lookup
+KEYWORD_CATEGORIES = _build_keyword_index()
+TONE_RE = compile_keyword_regex(KEYWORD_CATEGORIES)
+
+# Score for 0, 1, 2, 3 and 4+ keyword matches. Each keyword occurrence in the
+# text counts once per category listing it (e.g. 'terrible' is both sadness
+# and anger), regardless of how many times it was listed
+SCORE_TABLE = (0.0, 0.3, 0.6, 0.8, 1.0)
+
+def calculate_score(total_matches: int) -> float:
+    """Simplified scoring algorithm: more matches = higher score"""
+    return SCORE_TABLE[min(total_matches, 4)]
+
+def analyze_text_tone(text: str) -> Dict[str, float]:
+    """Analyze text tone and mood using simplified rule-based analysis"""
+    counts = [0] * len(TONE_CATEGORIES)
+    # Keywords are indexed lowercased, so lowercase the text once here rather
+    # than matching with re.IGNORECASE, which is slower
+    for match in TONE_RE.findall(text.lower()):
+        for category_id in KEYWORD_CATEGORIES[match]:
+            counts[category_id] += 1
+    
+    return {
+        name: calculate_score(count)
+        for name, count in zip(TONE_CATEGORIES, counts)
+    }